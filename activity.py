@@ -1,12 +1,23 @@
+from types import MappingProxyType
+
 import numpy as np
 
+from validation import validate_popularity
+
+# Expedited return time used for visitors without an expedited queue reservation
+NO_EXPEDITED_RETURN = np.iinfo(np.int32).max
+
 class Activity:
     """ 
     Class that defines an Activity within the park simulation.
-    This class stores activity characteristics, tracks visitors, 
-    and maintains a log of historical data.
+    This class stores activity characteristics and tracks visitors.
     """
 
+    __slots__ = (
+        "activity_characteristics", "random_seed", "_rng", "name", "popularity", "mean_time",
+        "visitors", "visitor_time_remaining", "_lengths", "_index", "_shared",
+    )
+
     def __init__(self, activity_characteristics, random_seed=None):
         """  
         Initializes an activity with given characteristics.
@@ -14,25 +25,18 @@ class Activity:
         Parameters:
             activity_characteristics (dict): A dictionary containing attributes like 
                                              name, popularity, and mean time spent.
-            random_seed (int, optional): A seed for random number generation 
+            random_seed (int or np.random.SeedSequence, optional): A seed for random number generation 
                                          to ensure reproducibility in simulation.
         """
 
         self.activity_characteristics = activity_characteristics  # Store input characteristics
-        self.state = {}  # Tracks the current state of the activity (e.g., visitors inside)
-        self.history = {}  # Stores historical visitor counts over time
         self.random_seed = random_seed  # Random seed for reproducible behavior
+        self._rng = np.random.default_rng(random_seed)  # Single generator reused for every stay time draw
 
         # Validate that popularity is an integer between 0 and 10
-        if (
-            type(self.activity_characteristics["popularity"]) != int 
-            or self.activity_characteristics["popularity"] < 0
-            or self.activity_characteristics["popularity"] > 10
-        ):
-            raise AssertionError(
-                f"Activity {self.activity_characteristics['name']} 'popularity' value must be an integer between"
-                " 0 and 10"
-            )
+        validate_popularity(
+            "Activity", self.activity_characteristics["name"], self.activity_characteristics["popularity"], 0, 10
+        )
 
         # Set up the activity
         self.initialize_activity()
@@ -41,7 +45,7 @@ class Activity:
     def initialize_activity(self):
         """ 
         Sets up the activity by defining its attributes and initializing 
-        its state and history tracking.
+        its state.
         """
 
         # Extract basic characteristics from the input dictionary
@@ -49,13 +53,75 @@ class Activity:
         self.popularity = self.activity_characteristics["popularity"]  # Popularity score (0-10)
         self.mean_time = self.activity_characteristics["mean_time"]  # Average time spent by a visitor
 
-        # State variables to track visitors and their remaining time
-        self.state["visitors"] = []  # List of visitor IDs currently in the activity
-        self.state["visitor_time_remaining"] = []  # List of time left for each visitor
+        # State variables to track visitors and their remaining time, stored as parallel arrays
+        # where only the first `self._n` entries are valid
+        self.visitors = np.zeros(16, dtype=np.int32)  # Visitor IDs currently in the activity
+        self.visitor_time_remaining = np.zeros(16, dtype=np.int32)  # Time left for each visitor
+        self._lengths = np.zeros(1, dtype=np.int32)  # Visitor counts, shared with other activities once bound
+        self._index = 0  # Position of this activity's count in `self._lengths`
+        self._shared = False  # Whether the visitor arrays are rows of a park-wide table
+
+    @property
+    def state(self):
+        """ 
+        Read-only mapping of the visitors currently in the activity and their remaining time. 
+        The arrays are live views of the activity's storage, not copies.
+        """
+        return MappingProxyType({
+            "visitors": self.visitors[:self._n],
+            "visitor_time_remaining": self.visitor_time_remaining[:self._n],
+        })
+
+    @property
+    def _n(self):
+        """ Number of visitors currently in the activity. """
+        return int(self._lengths[self._index])
+
+    @_n.setter
+    def _n(self, n):
+        self._lengths[self._index] = n
 
-        # History dictionary to store visitor counts over time
-        self.history["total_vistors"] = {}  # Tracks the total number of visitors per time unit
-           
+    def bind_storage(self, index, visitors, time_remaining, lengths):
+        """ 
+        Moves the activity's visitors into rows of park-wide arrays so all activities 
+        can be advanced together by `kernels.tick_activities`.
+
+        Parameters:
+            index (int): The activity's row in the shared arrays.
+            visitors (np.ndarray): Row of the shared visitor ID array.
+            time_remaining (np.ndarray): Row of the shared remaining time array.
+            lengths (np.ndarray): Shared array of visitor counts per activity.
+        """
+
+        n = self._n
+        if n > len(visitors):
+            raise AssertionError(f"Activity {self.name} shared storage cannot hold {n} visitors")
+        visitors[:n] = self.visitors[:n]
+        time_remaining[:n] = self.visitor_time_remaining[:n]
+        lengths[index] = n
+
+        self.visitors = visitors
+        self.visitor_time_remaining = time_remaining
+        self._lengths = lengths
+        self._index = index
+        self._shared = True
+
+    def _grow(self, n):
+        """ 
+        Ensures the visitor arrays can hold at least `n` visitors, doubling their size when full.
+
+        Parameters:
+            n (int): The number of visitors the arrays must be able to hold.
+        """
+
+        size = len(self.visitors)
+        if n > size:
+            if self._shared:
+                # Shared rows are sized by the park to hold every agent, they cannot be resized here
+                raise AssertionError(f"Activity {self.name} shared storage cannot hold {n} visitors")
+            size = max(n, size * 2)
+            self.visitors = np.resize(self.visitors, size)
+            self.visitor_time_remaining = np.resize(self.visitor_time_remaining, size)
 
     def add_to_activity(self, agent_id, expedited_return_time):
         """ 
@@ -63,30 +129,51 @@ class Activity:
 
         Parameters:
             agent_id (int): The unique ID of the visitor.
-            expedited_return_time (int or None): If the visitor has a fast-track reservation, 
-                                                 they must leave the activity before their ride time.
+            expedited_return_time (int): If the visitor has a fast-track reservation, they must leave 
+                                         the activity before their ride time. `NO_EXPEDITED_RETURN` 
+                                         for visitors without one.
         """
 
-        # Add the visitor to the list of current visitors
-        self.state["visitors"].append(agent_id)
-
-        # Generate a random stay duration using a normal distribution
-        if self.random_seed:
-            rng = np.random.default_rng(self.random_seed + agent_id)  # Use a reproducible random seed
-            stay_time = int(
-                max((rng.normal(self.mean_time, self.mean_time / 2, 1))[0], 1)
-            )  # Ensure the stay time is at least 1
-        else:
-            stay_time = int(
-                max((np.random.normal(self.mean_time, self.mean_time / 2, 1))[0], 1)
-            )  # Sample from a normal distribution with mean `mean_time`
+        # Generate a random stay duration using a normal distribution, ensuring it is at least 1
+        stay_time = max(1, int(self._rng.normal(self.mean_time, self.mean_time / 2)))
 
         # If the visitor has an expedited queue reservation, make them leave earlier
-        if expedited_return_time:
+        if expedited_return_time != NO_EXPEDITED_RETURN:
             stay_time = min(max(1, expedited_return_time), stay_time)
         
-        # Store the visitor's remaining time in the activity
-        self.state["visitor_time_remaining"].append(stay_time)
+        # Store the visitor and their remaining time in the activity
+        self._append(agent_id, stay_time)
+
+    def add_many(self, agent_ids, expedited_return_times):
+        """ 
+        Adds a batch of visitors (agents) to the activity, drawing all their stay times at once.
+
+        Parameters:
+            agent_ids (np.ndarray): The unique IDs of the visitors.
+            expedited_return_times (np.ndarray): Time until each visitor's fast-track reservation, 
+                                                 `NO_EXPEDITED_RETURN` for visitors without one.
+        """
+
+        # Generate random stay durations using a normal distribution, ensuring they are at least 1
+        stay_times = np.maximum(
+            self._rng.normal(self.mean_time, self.mean_time / 2, len(agent_ids)), 1
+        ).astype(np.int32)
+
+        # Visitors with an expedited queue reservation leave before their ride time
+        stay_times = np.minimum(stay_times, np.maximum(expedited_return_times, 1))
+
+        self._append(agent_ids, stay_times)
+
+    def _append(self, agent_ids, stay_times):
+        """ 
+        Appends one or more visitors and their stay times to the end of the valid region.
+        """
+
+        k = np.size(agent_ids)
+        self._grow(self._n + k)
+        self.visitors[self._n:self._n + k] = agent_ids
+        self.visitor_time_remaining[self._n:self._n + k] = stay_times
+        self._n += k
 
     def force_exit(self, agent_id):
         """ 
@@ -96,12 +183,16 @@ class Activity:
             agent_id (int): The unique ID of the visitor being removed.
         """
 
-        # Find the index of the visitor in the list
-        ind = self.state["visitors"].index(agent_id)
-        
-        # Remove the visitor and their remaining time
-        del self.state["visitors"][ind]
-        del self.state["visitor_time_remaining"][ind]
+        visitors = self.visitors
+        time_remaining = self.visitor_time_remaining
+
+        # Find the index of the visitor among the valid entries
+        ind = np.where(visitors[:self._n] == agent_id)[0][0]
+
+        # Move the last visitor into the freed slot (order within an activity does not matter)
+        visitors[ind] = visitors[self._n - 1]
+        time_remaining[ind] = time_remaining[self._n - 1]
+        self._n -= 1
 
     def step(self, time):
         """ 
@@ -111,23 +202,28 @@ class Activity:
             time (int): The current simulation time.
 
         Returns:
-            list: A list of visitor IDs who have exited the activity.
+            np.ndarray: An array of visitor IDs who have exited the activity.
         """
 
-        # Identify visitors who have completed their stay (remaining time = 0)
-        exiting_agents = [
-            (ind, agent_id) for ind, agent_id in enumerate(self.state["visitors"])
-            if self.state["visitor_time_remaining"][ind] == 0
-        ]
+        visitors = self.visitors[:self._n]
+        time_remaining = self.visitor_time_remaining[:self._n]
+
+        # Identify visitors who are staying, most ticks nobody leaves so the arrays are left untouched
+        staying = time_remaining > 0
+        total_staying = np.count_nonzero(staying)
+        if total_staying == len(visitors):
+            return visitors[:0].copy()
 
-        # Reverse the list to ensure indices remain valid while removing elements
-        exiting_agents.reverse()
-        for ind, agent_id in exiting_agents:
-            del self.state["visitors"][ind]
-            del self.state["visitor_time_remaining"][ind]
+        # Collect the visitors who have completed their stay (remaining time = 0)
+        exiting_agents = visitors[~staying]
 
-        # Return the list of visitor IDs who have left
-        return [agent_id for ind, agent_id in exiting_agents]
+        # Compact the remaining visitors to the front of the arrays in a single filtering pass each
+        visitors[:total_staying] = visitors[staying]
+        time_remaining[:total_staying] = time_remaining[staying]
+        self._n = total_staying
+
+        # Return the visitor IDs who have left
+        return exiting_agents
 
     def pass_time(self):
         """ 
@@ -135,17 +231,4 @@ class Activity:
         """
 
         # Decrease the remaining time for each visitor by 1
-        self.state["visitor_time_remaining"] = [
-            visitor_time - 1 for visitor_time in self.state["visitor_time_remaining"]
-        ]
-
-    def store_history(self, time):
-        """ 
-        Records the number of visitors in the activity at a given time.
-
-        Parameters:
-            time (int): The current simulation time.
-        """
-
-        # Update the history log with the current visitor count
-        self.history["total_vistors"][time] = len(self.state["visitors"])
+        self.visitor_time_remaining[:self._n] -= 1
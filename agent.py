@@ -1,7 +1,24 @@
-import random  # Used for random number generation in decision-making
+from types import MappingProxyType
+
 import numpy as np  # Used for probability distributions in behavior modeling
 
-from behavior_reference import BEHAVIOR_ARCHETYPE_PARAMETERS  # Import predefined behavior archetypes
+from behavior_reference import (  # Import predefined behavior archetypes and their age class distributions
+    BEHAVIOR_ARCHETYPE_PARAMETERS, 
+    AGE_CLASSES, 
+    AGE_CLASS_CDFS,
+)
+
+def build_cdf(distribution):
+    """ Splits a {name: weight} distribution into an array of names and an array of cumulative weights. """
+    names = np.array(list(distribution.keys()))
+    cdf = np.cumsum(np.fromiter(distribution.values(), dtype=float))
+    return names, cdf
+
+def sample_cdf(rng, cdf, size=None):
+    """ Draws indices from a cumulative distribution, `size` of them in one vectorized call when given. """
+    draws = rng.random(size) * cdf[-1]
+    # side="right" skips zero weight entries, the clip guards against floating point error in the last entry
+    return np.minimum(np.searchsorted(cdf, draws, side="right"), len(cdf) - 1)
 
 class Agent:
     """ 
@@ -9,120 +26,186 @@ class Agent:
     Tracks agent's state, decisions, and history of actions.
     """
 
-    def __init__(self, random_seed):
-        """ 
-        Initializes the agent with a unique ID, state tracking, and behavior settings.
+    # Fixed attribute layout keeps the many agent instances small and their attribute access fast
+    __slots__ = (
+        "agent_id", "log_events", "_rng", "behavior",
+        "arrival_time", "exit_time", "within_park", "current_location", "current_action",
+        "time_spent_at_current_location", "expedited_return_expiry", "expedited_pass",
+        "expedited_pass_ability", "exp_wait_threshold", "exp_limit", "age_class",
+        "attraction_ids", "activity_ids", "attr_visits", "act_visits", "act_time",
+    )
 
-        Parameters:
-        - random_seed (int): Seed for random number generation to ensure reproducibility.
+    def __init__(self):
+        """ 
+        Creates an empty agent, its ID, state and behavior are set by `create_population`.
         """
 
         self.agent_id = None  # Unique identifier for the agent
-        self.state = {}  # Dictionary to store the agent's current state
-        self.log = ""  # Text log of agent's activities for tracking behavior
-        self.random_seed = random_seed  # Seed for generating random choices
-
-        # Ensure behavior archetype probabilities add up to 1
-        for behavior_type, behavior_dict in BEHAVIOR_ARCHETYPE_PARAMETERS.items():
-            age_class_sum = (
-                behavior_dict["percent_no_child_rides"] +
-                behavior_dict["percent_no_adult_rides"] +
-                behavior_dict["percent_no_preference"]
-            )
-            # Due to floating point precision, allow for small rounding errors (0.98 <= sum <= 1.0)
-            if not 0.98 <= age_class_sum <= 1.0:
-                raise AssertionError(
-                    f"Behavior Archetype {behavior_type} characteristics must sum to 1."
-                )
+        self.log_events = []  # (time, message) log of agent's activities for tracking behavior
 
-    def initialize_agent(
-        self, 
-        behavior_archetype_distribution, 
-        exp_ability, 
+    @property
+    def log(self):
+        """ Text log of agent's activities, built from the logged events only when requested. """
+        return "".join(f"{time}: {message}\n" for time, message in self.log_events)
+
+    @property
+    def state(self):
+        """ 
+        Read-only mapping of the agent's current state. Writes raise a TypeError, set the attributes instead. 
+        `expedited_return_expiry` and `expedited_pass` are the agent's live containers, not copies.
+        """
+        return MappingProxyType({
+            "arrival_time": self.arrival_time,
+            "exit_time": self.exit_time,
+            "within_park": self.within_park,
+            "current_location": self.current_location,
+            "current_action": self.current_action,
+            "time_spent_at_current_location": self.time_spent_at_current_location,
+            "expedited_return_expiry": self.expedited_return_expiry,
+            "expedited_pass": self.expedited_pass,
+            "expedited_pass_ability": self.expedited_pass_ability,
+            "exp_wait_threshold": self.exp_wait_threshold,
+            "exp_limit": self.exp_limit,
+            "age_class": self.age_class,
+        })
+
+    @classmethod
+    def create_population(
+        cls,
+        n,
+        behavior_archetype_distribution,
+        exp_ability_pct,
         exp_wait_threshold,
         exp_limit,
-        agent_id, 
-        attraction_names, 
-        activity_names
+        attraction_ids,
+        activity_ids,
+        master_seed,
     ):
         """ 
-        Initializes the agent's characteristics, state, and behavior.
+        Creates `n` agents at once, drawing every agent's random characteristics in a few vectorized calls 
+        from a single generator instead of initializing each agent separately. Each agent then makes its 
+        own decisions from an independent random stream, so its choices do not depend on other agents.
 
         Parameters:
+        - n (int): Number of agents to create, they receive IDs 0 to n - 1
         - behavior_archetype_distribution (dict): Distribution of behavior archetypes
-        - exp_ability (bool): Whether the agent can use an expedited pass
-        - exp_wait_threshold (int): Maximum wait time the agent is willing to accept
-        - exp_limit (int): Maximum number of expedited passes the agent can hold
-        - agent_id (int): Unique identifier for the agent
-        - attraction_names (list): List of all attractions in the park
-        - activity_names (list): List of all activities (non-ride experiences)
+        - exp_ability_pct (float): Probability that an agent can use an expedited pass
+        - exp_wait_threshold (int): Maximum wait time the agents are willing to accept
+        - exp_limit (int): Maximum number of expedited passes an agent can hold
+        - attraction_ids (dict): Maps each attraction in the park to its index in the visit arrays
+        - activity_ids (dict): Maps each activity (non-ride experience) to its index in the visit arrays
+        - master_seed (int): Seed of the population generator, the agents' own streams are spawned from it
+
+        Returns:
+        - list: The created agents, ordered by agent ID
         """
 
-        self.agent_id = agent_id  # Assign unique ID to the agent
+        rng = np.random.default_rng(master_seed)
+        agent_seeds = np.random.SeedSequence(master_seed).spawn(n)
 
-        # Initialize state variables
-        self.state.update(
-            {
-                "arrival_time": None, 
-                "exit_time": None, 
-                "within_park": False,  # Whether the agent is currently in the park
-                "current_location": None,  # The agent's current location (e.g., in queue, at an attraction)
-                "current_action": None,  # The agent's current action (e.g., waiting, riding, eating)
-                "time_spent_at_current_location": 0,
-                "expedited_return_time": [],  # List of return times for expedited queue passes
-                "expedited_pass": [],  # List of expedited passes the agent holds
-                "expedited_pass_ability": exp_ability,  # Whether agent can get an expedited pass
-                "exp_wait_threshold": exp_wait_threshold,  # Max wait time agent is willing to wait
-                "exp_limit": exp_limit  # Max number of expedited passes the agent can hold
-            }
-        )
+        # Behavior archetypes for every agent in one binary search over the archetype distribution
+        behavior_archetype_names, behavior_archetype_cdf = build_cdf(behavior_archetype_distribution)
+        archetype_indices = sample_cdf(rng, behavior_archetype_cdf, size=n)
 
-        # Initialize history of attractions visited
-        self.state.update(
-            {
-                "attractions": {
-                    attraction: {"times_completed": 0}  # Track how many times each attraction was visited
-                    for attraction in attraction_names
-                }
-            }
-        )
+        # Age classes, searching each archetype's age class distribution for the agents holding that archetype
+        age_class_indices = np.zeros(n, dtype=np.intp)
+        for archetype_index, behavior_archetype in enumerate(behavior_archetype_names):
+            selected = archetype_indices == archetype_index
+            age_class_indices[selected] = sample_cdf(
+                rng, AGE_CLASS_CDFS[behavior_archetype], size=np.count_nonzero(selected)
+            )
 
-        # Initialize history of activities visited
-        self.state.update(
-            {
-                "activities": {
-                    activity: {"times_visited": 0, "time_spent": 0}  # Track visits and time spent at activities
-                    for activity in activity_names
-                }
-            }
-        )
+        # Preferred park visit durations, drawn around each agent's archetype mean
+        mean_stay_times = np.array(
+            [
+                BEHAVIOR_ARCHETYPE_PARAMETERS[behavior_archetype]["stay_time_preference"] 
+                for behavior_archetype in behavior_archetype_names
+            ], 
+            dtype=float
+        )[archetype_indices]
+        stay_time_preferences = np.maximum(rng.normal(mean_stay_times, mean_stay_times / 4), 0).astype(np.int32)
 
-        # Select the agent's behavior archetype based on probability distribution
-        behavior_archetype = self.select_behavior_archetype(
-            behavior_archetype_distribution=behavior_archetype_distribution,
-            agent_id=agent_id,
-        )
+        exp_abilities = rng.random(n) < exp_ability_pct
 
-        # Assign age class based on selected behavior archetype
-        self.state.update(
-            {
-                "age_class": self.select_age_class(
-                    agent_id=agent_id,
-                    behavior_archetype_dict=BEHAVIOR_ARCHETYPE_PARAMETERS[behavior_archetype]
-                )
-            }
-        )
+        # Visit counts of the whole population, each agent works on its own row
+        attr_visits = np.zeros((n, len(attraction_ids)), dtype=np.int16)
+        act_visits = np.zeros((n, len(activity_ids)), dtype=np.int16)
+        act_time = np.zeros((n, len(activity_ids)), dtype=np.int32)
+
+        behavior_archetypes = behavior_archetype_names[archetype_indices].tolist()
+        age_classes = AGE_CLASSES[age_class_indices].tolist()
+        agents = []
+        for agent_id in range(n):
+            agent = cls()
+            agent._initialize_state(
+                agent_id=agent_id,
+                rng=np.random.default_rng(agent_seeds[agent_id]),
+                exp_ability=bool(exp_abilities[agent_id]),
+                exp_wait_threshold=exp_wait_threshold,
+                exp_limit=exp_limit,
+                attraction_ids=attraction_ids,
+                activity_ids=activity_ids,
+                attr_visits=attr_visits[agent_id],
+                act_visits=act_visits[agent_id],
+                act_time=act_time[agent_id],
+            )
+            agent._assign_behavior(
+                behavior_archetype=behavior_archetypes[agent_id],
+                age_class=age_classes[agent_id],
+                stay_time_preference=int(stay_time_preferences[agent_id]),
+            )
+            agents.append(agent)
+
+        return agents
+
+    def _initialize_state(
+        self, 
+        agent_id, 
+        rng, 
+        exp_ability, 
+        exp_wait_threshold, 
+        exp_limit, 
+        attraction_ids, 
+        activity_ids, 
+        attr_visits, 
+        act_visits, 
+        act_time
+    ):
+        """ Sets the agent's ID, random generator, initial state and visit history. """
+
+        self.agent_id = agent_id  # Assign unique ID to the agent
+        self._rng = rng  # The agent's own random stream, used for every decision the agent makes
+
+        # Initialize state variables
+        self.arrival_time = None
+        self.exit_time = None
+        self.within_park = False  # Whether the agent is currently in the park
+        self.current_location = None  # The agent's current location (e.g., in queue, at an attraction)
+        self.current_action = None  # The agent's current action (e.g., waiting, riding, eating)
+        self.time_spent_at_current_location = 0
+        self.expedited_return_expiry = np.empty(0, dtype=np.int32)  # Simulation times when expedited passes can be redeemed
+        self.expedited_pass = []  # List of expedited passes the agent holds
+        self.expedited_pass_ability = exp_ability  # Whether agent can get an expedited pass
+        self.exp_wait_threshold = exp_wait_threshold  # Max wait time agent is willing to wait
+        self.exp_limit = exp_limit  # Max number of expedited passes the agent can hold
+
+        # Initialize history of attractions and activities visited, indexed by the ids shared across the park
+        self.attraction_ids = attraction_ids
+        self.activity_ids = activity_ids
+        self.attr_visits = attr_visits  # Times each attraction was completed
+        self.act_visits = act_visits  # Times each activity was visited
+        self.act_time = act_time  # Time spent at each activity
+
+    def _assign_behavior(self, behavior_archetype, age_class, stay_time_preference):
+        """ Stores the agent's age class and the behavior traits of its archetype. """
 
         # Ensure that an age class was assigned correctly
-        if not self.state["age_class"]:
-            assert True is False  # This will raise an AssertionError
+        if not age_class:
+            raise AssertionError(f"Agent {self.agent_id} was not assigned an age class.")
+        self.age_class = age_class
 
         # Extract behavior parameters from the selected archetype
         parameters = BEHAVIOR_ARCHETYPE_PARAMETERS[behavior_archetype]
-        rng = np.random.default_rng(self.random_seed + self.agent_id)
-        stay_time_preference = int(
-            max((rng.normal(parameters["stay_time_preference"], parameters["stay_time_preference"] / 4, 1))[0], 0)
-        )
 
         # Store behavior traits in the agent
         self.behavior = {
@@ -133,45 +216,21 @@ class Agent:
             "wait_threshold": parameters["wait_threshold"],  # Max wait time the agent is willing to tolerate
         }
 
-    def select_behavior_archetype(self, agent_id, behavior_archetype_distribution):
-        """ Selects a behavior archetype based on probability distribution. """
-        rng = random.uniform(0, sum(behavior_archetype_distribution.values()))
-        floor = 0.0
-        for behavior_archetype, behavior_archetype_weight in behavior_archetype_distribution.items():
-            floor += behavior_archetype_weight
-            if rng < floor: 
-                return behavior_archetype
-    
-    def select_age_class(self, agent_id, behavior_archetype_dict):
-        """ Selects an age class based on behavior archetype settings. """
-        age_class_distribution = {
-            "no_child_rides": behavior_archetype_dict["percent_no_child_rides"],
-            "no_adult_rides": behavior_archetype_dict["percent_no_adult_rides"],
-            "no_preference": behavior_archetype_dict["percent_no_preference"]
-        }
-        rng = random.uniform(0, sum(age_class_distribution.values()))
-        floor = 0.0
-        for age_class, age_class_weight in age_class_distribution.items():
-            floor += age_class_weight
-            if rng < floor: 
-                return age_class
-
     def arrive_at_park(self, time):
         """ Updates the agent state and log when they arrive at the park. """
-        self.state["within_park"] = True
-        self.state["arrival_time"] = time
-        self.state["current_location"] = "gate"
-        self.state["current_action"] = "idling"
-        self.state["time_spent_at_current_location"] = 0
-        self.log += f"Agent arrived at park at time {time}. "
+        self.within_park = True
+        self.arrival_time = time
+        self.current_location = "gate"
+        self.current_action = "idling"
+        self.time_spent_at_current_location = 0
+        self.log_events.append((time, "Agent arrived at park."))
 
     def decide_to_leave_park(self, time):
         """ Determines whether the agent should leave the park. """
         action, location = None, None
-        if time != self.state["arrival_time"]:
-            actual_preference_value = (time - self.state["arrival_time"]) - self.behavior["stay_time_preference"]           
-            rng = np.random.default_rng(self.random_seed+self.agent_id+time)
-            normal_coinflip = (rng.normal(0, 1, 1) * 60)[0]
+        if time != self.arrival_time:
+            actual_preference_value = (time - self.arrival_time) - self.behavior["stay_time_preference"]           
+            normal_coinflip = self._rng.normal() * 60
             if actual_preference_value > normal_coinflip:
                 action = "leaving"
                 location = "gate"
@@ -179,7 +238,25 @@ class Agent:
 
     def pass_time(self):
         """ Advances time for the agent by one unit (1 minute). """
-        if self.state["within_park"]:
-            self.state["time_spent_at_current_location"] += 1
-            if self.state["expedited_pass"]:
-                self.state["expedited_return_time"] = [val - 1 for val in self.state["expedited_return_time"]]
+        if self.within_park:
+            self.time_spent_at_current_location += 1
+
+    def assign_expedited_return_time(self, expedited_wait_time, time):
+        """ 
+        Records when the newest expedited pass can be redeemed. Return times are stored as absolute 
+        simulation times, so they never need to be counted down; compare them against the current time instead.
+        """
+        self.expedited_return_expiry = np.append(
+            self.expedited_return_expiry, np.int32(time + expedited_wait_time)
+        )
+
+    def remove_expedited_return_time(self, attraction):
+        """ 
+        Drops the return time of the expedited pass for an attraction once it is redeemed or returned, keeping 
+        `expedited_return_expiry` aligned with `expedited_pass`. Must be called before the pass itself is removed.
+
+        Parameters:
+        - attraction (str): Name of the attraction the pass belongs to
+        """
+        index = self.expedited_pass.index(attraction)
+        self.expedited_return_expiry = np.delete(self.expedited_return_expiry, index)
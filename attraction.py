@@ -1,10 +1,38 @@
+from types import MappingProxyType
+
+import numpy as np
+
+from kernels import wait_runs
+from validation import validate_popularity
+
+def _make_room(queue, head, n):
+    """ 
+    Ensures a queue array holding `n` visitors from index `head` can take one more visitor at its end. 
+    Slots freed at the front are reclaimed once they make up half the array, otherwise the array 
+    doubles in size. Returns the (possibly new) array and the (possibly moved) front of the queue.
+    """
+    if head + n < len(queue):
+        return queue, head
+    if head >= len(queue) // 2:
+        queue[:n] = queue[head:head + n]
+        return queue, 0
+    return np.resize(queue, len(queue) * 2), head
+
 class Attraction:
     """ 
     Class representing an attraction in the theme park simulation.
-    It stores attraction characteristics, manages visitor queues, 
-    and tracks operational history.
+    It stores attraction characteristics and manages visitor queues.
     """
 
+    __slots__ = (
+        "attraction_characteristics", "name", "run_time", "capacity", "popularity",
+        "child_eligible", "adult_eligible", "run_time_remaining", "expedited_queue", "exp_queue_ratio",
+        "exp_queue_passes", "_capacity", "_exp_seats", "_standby_seats", "_exp_passes_per_hour",
+        "_queue_n", "_exp_queue_n", "_queue_head", "_exp_queue_head",
+        "agents_in_attraction", "queue", "exp_queue", "exp_queue_passes_distributed",
+        "_wait_dirty", "_cached_wait_runs", "_cached_exp_wait_runs",
+    )
+
     def __init__(self, attraction_characteristics):
         """  
         Initializes the attraction with given characteristics.
@@ -15,18 +43,11 @@ class Attraction:
         """
 
         self.attraction_characteristics = attraction_characteristics  # Store attraction details
-        self.state = {}  # Holds current queue and ride state
-        self.history = {}  # Stores historical data like queue length over time
 
         # Validate that popularity is an integer between 1 and 10
-        if (
-            type(self.attraction_characteristics["popularity"]) != int 
-            or self.attraction_characteristics["popularity"] < 1
-            or self.attraction_characteristics["popularity"] > 10
-        ):
-            raise AssertionError(
-                f"Attraction {self.attraction_characteristics['name']} 'popularity' value must be an integer between 1 and 10"
-            )
+        validate_popularity(
+            "Attraction", self.attraction_characteristics["name"], self.attraction_characteristics["popularity"], 1, 10
+        )
 
         # Initialize the attraction’s state and parameters
         self.initialize_attraction()
@@ -48,46 +69,83 @@ class Attraction:
         self.exp_queue_ratio = self.attraction_characteristics["expedited_queue_ratio"]  # Proportion of seats for fast-pass users
         self.exp_queue_passes = 0  # Number of available fast passes
 
-        # Initialize queue states
-        self.state["agents_in_attraction"] = []  # List of visitors currently on the ride
-        self.state["queue"] = []  # List of visitors in the regular queue
-        self.state["exp_queue"] = []  # List of visitors in the expedited queue
-        self.state["exp_queue_passes_distributed"] = 0  # Track how many passes have been given out
+        # Integer seat counts used by the wait time calculations. The product is taken before dividing so
+        # whole capacities are exact instead of landing just under the integer; a fractional capacity
+        # seats only its whole part.
+        self._capacity = int(self.attraction_characteristics["hourly_throughput"] * self.run_time // 60)
+        if self._capacity < 1:
+            raise AssertionError(
+                f"Attraction {self.name} must seat at least one visitor per run"
+            )
+        self._exp_seats = int(self._capacity * self.exp_queue_ratio)
+        self._standby_seats = self._capacity - self._exp_seats
+
+        # Expedited passes the attraction can honor per operating hour, used to ration passes as the day goes on
+        self._exp_passes_per_hour = self.capacity * (60 / self.run_time) * self.exp_queue_ratio
+
+        # Initialize queue states, visitors in each queue occupy `_queue_n`/`_exp_queue_n` entries of the array
+        # starting at `_queue_head`/`_exp_queue_head`, so riders can be loaded from the front without shifting
+        self.agents_in_attraction = np.zeros(0, dtype=np.int32)  # Visitors currently on the ride
+        self.queue = np.zeros(16, dtype=np.int32)  # Visitors in the regular queue
+        self.exp_queue = np.zeros(16, dtype=np.int32)  # Visitors in the expedited queue
+        self._queue_n = 0  # Number of visitors in the regular queue
+        self._exp_queue_n = 0  # Number of visitors in the expedited queue
+        self._queue_head = 0  # Position of the front of the regular queue
+        self._exp_queue_head = 0  # Position of the front of the expedited queue
+        self.exp_queue_passes_distributed = 0  # Track how many passes have been given out
+
+        # Ride runs ahead of each queue, recomputed only after the queues change
+        self._wait_dirty = True
+        self._cached_wait_runs = 0
+        self._cached_exp_wait_runs = 0
+
+    @property
+    def state(self):
+        """ 
+        Read-only mapping of the ride and its queues, in the order visitors will board. 
+        The arrays are live views of the attraction's storage, not copies.
+        """
+        return MappingProxyType({
+            "agents_in_attraction": self.agents_in_attraction,
+            "queue": self.queue[self._queue_head:self._queue_head + self._queue_n],
+            "exp_queue": self.exp_queue[self._exp_queue_head:self._exp_queue_head + self._exp_queue_n],
+            "exp_queue_passes_distributed": self.exp_queue_passes_distributed,
+        })
+
+    @property
+    def queue_length(self):
+        """ Number of visitors waiting in the standby queue. """
+        return self._queue_n
+
+    @property
+    def exp_queue_length(self):
+        """ Number of visitors waiting in the expedited queue. """
+        return self._exp_queue_n
+
+    def _update_wait_runs(self):
+        """ 
+        Recomputes the ride runs ahead of each queue if the queues changed since the last call.
+        """
+        if not self._wait_dirty:
+            return
 
-        # Initialize history tracking
-        self.history["queue_length"] = {}
-        self.history["queue_wait_time"] = {}
-        self.history["exp_queue_length"] = {}
-        self.history["exp_queue_wait_time"] = {}
+        if self.expedited_queue:
+            self._cached_wait_runs = wait_runs(
+                self._queue_n, self._exp_queue_n, self._capacity, self._exp_seats, self._standby_seats, False
+            )
+            self._cached_exp_wait_runs = wait_runs(
+                self._queue_n, self._exp_queue_n, self._capacity, self._exp_seats, self._standby_seats, True
+            )
+        else:
+            self._cached_wait_runs = self._queue_n // self._capacity
+        self._wait_dirty = False
 
     def get_wait_time(self):
         """ 
         Calculates and returns the expected wait time for regular queue.
         """
-
-        if self.expedited_queue:
-            queue_len = len(self.state["queue"])
-            exp_queue_len = len(self.state["exp_queue"])
-            exp_seats = int(self.capacity * self.exp_queue_ratio)
-            standby_seats = self.capacity - exp_seats
-
-            runs = 0
-            while queue_len >= self.capacity:
-                if exp_queue_len > exp_seats:
-                    exp_queue_len -= exp_seats
-                    if queue_len > standby_seats:
-                        queue_len -= standby_seats
-                    else:
-                        queue_len = 0
-                else:
-                    queue_len -= self.capacity - exp_queue_len
-                    exp_queue_len = 0
-
-                runs += 1
-
-            return runs * self.run_time + self.run_time_remaining
-        else:
-            return (len(self.state["queue"]) // self.capacity) * self.run_time + self.run_time_remaining
+        self._update_wait_runs()
+        return self._cached_wait_runs * self.run_time + self.run_time_remaining
 
     def get_exp_wait_time(self):
         """ 
@@ -95,26 +153,8 @@ class Attraction:
         """
 
         if self.expedited_queue:
-            queue_len = len(self.state["queue"])
-            exp_queue_len = len(self.state["exp_queue"])
-            exp_seats = int(self.capacity * self.exp_queue_ratio)
-            standby_seats = self.capacity - exp_seats
-
-            runs = 0
-            while exp_queue_len >= self.capacity:
-                if exp_queue_len > exp_seats:
-                    exp_queue_len -= exp_seats
-                    if queue_len > standby_seats:
-                        queue_len -= standby_seats
-                    else:
-                        queue_len = 0
-                else:
-                    queue_len -= self.capacity - exp_queue_len
-                    exp_queue_len = 0
-
-                runs += 1
-
-            return runs * self.run_time + self.run_time_remaining
+            self._update_wait_runs()
+            return self._cached_exp_wait_runs * self.run_time + self.run_time_remaining
         else:
             return 0
 
@@ -122,13 +162,19 @@ class Attraction:
         """ 
         Adds an agent (visitor) to the regular queue.
         """
-        self.state["queue"].append(agent_id)
+        self.queue, self._queue_head = _make_room(self.queue, self._queue_head, self._queue_n)
+        self.queue[self._queue_head + self._queue_n] = agent_id
+        self._queue_n += 1
+        self._wait_dirty = True
 
     def add_to_exp_queue(self, agent_id):
         """ 
         Adds an agent (visitor) to the expedited queue and returns their estimated wait time.
         """
-        self.state["exp_queue"].append(agent_id)
+        self.exp_queue, self._exp_queue_head = _make_room(self.exp_queue, self._exp_queue_head, self._exp_queue_n)
+        self.exp_queue[self._exp_queue_head + self._exp_queue_n] = agent_id
+        self._exp_queue_n += 1
+        self._wait_dirty = True
         expedited_wait_time = self.get_exp_wait_time()
         return expedited_wait_time
 
@@ -137,15 +183,22 @@ class Attraction:
         Removes an expedited pass when it is redeemed.
         """
         self.exp_queue_passes -= 1
-        self.state["exp_queue_passes_distributed"] += 1
+        self.exp_queue_passes_distributed += 1
 
     def return_pass(self, agent_id):
         """ 
         Cancels an expedited pass (if the visitor leaves the park before using it).
         """
         self.exp_queue_passes += 1
-        self.state["exp_queue_passes_distributed"] -= 1
-        self.state["exp_queue"].remove(agent_id)
+        self.exp_queue_passes_distributed -= 1
+        exp_queue = self.exp_queue
+        head = self._exp_queue_head
+        end = head + self._exp_queue_n
+        ind = head + np.where(exp_queue[head:end] == agent_id)[0][0]
+        # Shift the rest of the queue forward to preserve the order of the remaining visitors
+        exp_queue[ind:end - 1] = exp_queue[ind + 1:end]
+        self._exp_queue_n -= 1
+        self._wait_dirty = True
 
     def step(self, time, park_close):
         """ 
@@ -155,8 +208,8 @@ class Attraction:
         - Begins the ride.
         """
 
-        exiting_agents = []
-        loaded_agents = []
+        exiting_agents = np.zeros(0, dtype=np.int32)
+        loaded_agents = np.zeros(0, dtype=np.int32)
 
         # Adjust fast-pass availability as the park closes
         if self.expedited_queue:
@@ -164,11 +217,11 @@ class Attraction:
                 remaining_operating_hours = (park_close - time) // 60
                 passed_operating_hours = time // 60
                 self.exp_queue_passes = (
-                    (self.capacity * (60 / self.run_time) * self.exp_queue_ratio * remaining_operating_hours) 
+                    (self._exp_passes_per_hour * remaining_operating_hours) 
                     - max(
                         (
-                            self.state["exp_queue_passes_distributed"] - 
-                            (self.capacity * (60 / self.run_time) * self.exp_queue_ratio * passed_operating_hours)
+                            self.exp_queue_passes_distributed - 
+                            (self._exp_passes_per_hour * passed_operating_hours)
                         ), 
                         0
                     )
@@ -178,25 +231,31 @@ class Attraction:
 
         if self.run_time_remaining == 0:
             # Unload previous riders
-            exiting_agents = self.state["agents_in_attraction"]
-            self.state["agents_in_attraction"] = []
+            exiting_agents = self.agents_in_attraction
             self.run_time_remaining = self.run_time
 
             # Assign available seats between expedited and regular queues
-            max_exp_queue_agents = int(self.capacity * self.exp_queue_ratio)
-            max_queue_agents = max(self.capacity - len(self.state["exp_queue"]), 0)
-
-            # Load expedited queue riders first
-            expedited_agents_to_load = self.state["exp_queue"][:max_exp_queue_agents]
-            self.state["agents_in_attraction"] = expedited_agents_to_load
-            self.state["exp_queue"] = self.state["exp_queue"][max_exp_queue_agents:]
+            max_exp_queue_agents = min(self._exp_seats, self._exp_queue_n)
+            max_queue_agents = min(max(self._capacity - self._exp_queue_n, 0), self._queue_n)
+
+            # Load expedited queue riders first, then regular queue riders, from the front of each queue
+            exp_head = self._exp_queue_head
+            head = self._queue_head
+            self.agents_in_attraction = np.concatenate(
+                (
+                    self.exp_queue[exp_head:exp_head + max_exp_queue_agents], 
+                    self.queue[head:head + max_queue_agents],
+                )
+            )
 
-            # Load regular queue riders
-            agents_to_load = self.state["queue"][:max_queue_agents]
-            self.state["agents_in_attraction"].extend(agents_to_load)
-            self.state["queue"] = self.state["queue"][max_queue_agents:]
+            # Advance the front of each queue past the loaded riders, resetting it once a queue is empty
+            self._exp_queue_n -= max_exp_queue_agents
+            self._exp_queue_head = exp_head + max_exp_queue_agents if self._exp_queue_n else 0
+            self._queue_n -= max_queue_agents
+            self._queue_head = head + max_queue_agents if self._queue_n else 0
+            self._wait_dirty = True
 
-            loaded_agents = self.state["agents_in_attraction"]
+            loaded_agents = self.agents_in_attraction
         
         return exiting_agents, loaded_agents
 
@@ -205,12 +264,3 @@ class Attraction:
         Advances the ride timer by one minute.
         """
         self.run_time_remaining -= 1
-
-    def store_history(self, time):
-        """ 
-        Records queue lengths and wait times for analysis.
-        """
-        self.history["queue_length"][time] = len(self.state["queue"])
-        self.history["queue_wait_time"][time] = self.get_wait_time()
-        self.history["exp_queue_length"][time] = len(self.state["exp_queue"])
-        self.history["exp_queue_wait_time"][time] = self.get_exp_wait_time()
@@ -1,3 +1,5 @@
+import numpy as np
+
 # This file defines behavior archetypes for agents (park visitors) in a theme park simulation.
 # Each archetype represents a different type of visitor behavior.
 
@@ -96,3 +98,37 @@ BEHAVIOR_ARCHETYPE_PARAMETERS = {
         "percent_no_preference": 0.0
     },
 }
+
+def _validate_age_classes():
+    """ 
+    Ensures each archetype's age class proportions add up to 1.
+    Due to floating point precision, allow for small rounding errors (0.98 <= sum <= 1.0)
+    """
+
+    for behavior_type, behavior_dict in BEHAVIOR_ARCHETYPE_PARAMETERS.items():
+        age_class_sum = (
+            behavior_dict["percent_no_child_rides"] +
+            behavior_dict["percent_no_adult_rides"] +
+            behavior_dict["percent_no_preference"]
+        )
+        if not 0.98 <= age_class_sum <= 1.0:
+            raise AssertionError(
+                f"Behavior Archetype {behavior_type} characteristics must sum to 1."
+            )
+
+# Checked once when this module is imported
+_validate_age_classes()
+
+# Age classes in sampling order, and the cumulative age class distribution of each archetype.
+# These are built once so agents can pick an age class with a single binary search.
+AGE_CLASSES = np.array(["no_child_rides", "no_adult_rides", "no_preference"])
+AGE_CLASS_CDFS = {
+    behavior_type: np.cumsum(
+        [
+            behavior_dict["percent_no_child_rides"],
+            behavior_dict["percent_no_adult_rides"],
+            behavior_dict["percent_no_preference"],
+        ]
+    )
+    for behavior_type, behavior_dict in BEHAVIOR_ARCHETYPE_PARAMETERS.items()
+}
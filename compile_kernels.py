@@ -0,0 +1,30 @@
+# This script compiles the kernels in kernels.py ahead of time into the `park_kernels` extension module.
+# Run it after installing Numba and after every change to kernels.py (python compile_kernels.py), then set
+# PARK_KERNELS_AOT=1 so simulations skip JIT compilation on their first tick. kernels.py ignores a build
+# made from a different version of its source and falls back to Numba's JIT.
+
+import os
+import sys
+
+from numba.pycc import CC
+
+# Hide any previous build so the kernels below are the Python sources rather than the compiled exports
+sys.modules["park_kernels"] = None
+import kernels
+
+cc = CC("park_kernels")
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+cc.export("wait_runs", "i8(i8, i8, i8, i8, i8, b1)")(kernels.wait_runs.py_func)
+cc.export("tick_activities", "void(i4[:, :], i4[:, :], i4[:], i4[:, :], i4[:])")(kernels.tick_activities.py_func)
+
+# Record which kernels.py the build came from
+digest = kernels.source_digest()
+
+def built_source_digest():
+    return digest
+
+cc.export("source_digest", "i8()")(built_source_digest)
+
+if __name__ == "__main__":
+    cc.compile()
@@ -0,0 +1,115 @@
+# This file contains the numeric kernels used in the hot paths of the park simulation.
+# Kernels are compiled with Numba when it is installed and run as plain Python otherwise.
+
+import hashlib
+import os
+import warnings
+
+try:
+    from numba import njit, prange
+except ImportError:
+    prange = range
+
+    def njit(*args, **kwargs):
+        """ Stand-in for numba.njit that leaves the function uncompiled. """
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda function: function
+
+
+@njit(cache=True, fastmath=True)
+def wait_runs(queue_len, exp_queue_len, capacity, exp_seats, standby_seats, target_exp):
+    """ 
+    Counts the ride runs needed before the front of a queue is reached, in constant time.
+
+    Parameters:
+    - queue_len (int): Number of visitors in the regular queue
+    - exp_queue_len (int): Number of visitors in the expedited queue
+    - capacity (int): Maximum visitors per ride run
+    - exp_seats (int): Seats per run reserved for the expedited queue
+    - standby_seats (int): Seats per run left for the regular queue
+    - target_exp (bool): Count runs for the expedited queue instead of the regular queue
+    """
+
+    if target_exp:
+        # Expedited riders board `exp_seats` at a time until fewer than a full run remain.
+        # An expedited queue without reserved seats never drains, so no runs are reported.
+        if exp_queue_len < capacity or exp_seats <= 0:
+            return 0
+        return (exp_queue_len - capacity) // exp_seats + 1
+
+    if queue_len < capacity:
+        return 0
+    if exp_seats <= 0:
+        return queue_len // capacity
+
+    # Phase A: while the expedited queue overfills its seats, each run takes `standby_seats` regular riders
+    exp_runs = (exp_queue_len - 1) // exp_seats if exp_queue_len > exp_seats else 0
+    if standby_seats > 0:
+        drain_runs = (queue_len - capacity) // standby_seats + 1
+        if drain_runs <= exp_runs:
+            return drain_runs
+    queue_len -= exp_runs * standby_seats
+    exp_queue_len -= exp_runs * exp_seats
+
+    # Phase B: one run takes the leftover expedited riders, then each run takes a full load of regular riders
+    return exp_runs + 1 + (queue_len - capacity + exp_queue_len) // capacity
+
+
+@njit(cache=True, parallel=True)
+def tick_activities(time_remaining, visitors, lengths, exiting, exiting_lengths):
+    """ 
+    Advances every activity by one minute in a single pass: visitors whose stay is over 
+    are removed and the remaining time of everyone else is counted down.
+
+    Row `a` of each 2D array belongs to activity `a`, and only its first `lengths[a]` entries are valid.
+
+    Parameters:
+    - time_remaining (np.ndarray): Remaining stay time of each visitor, updated in place
+    - visitors (np.ndarray): Visitor IDs, compacted in place
+    - lengths (np.ndarray): Number of visitors in each activity, updated in place
+    - exiting (np.ndarray): Receives the IDs of exiting visitors
+    - exiting_lengths (np.ndarray): Receives the number of exiting visitors per activity
+    """
+
+    for a in prange(lengths.shape[0]):
+        kept = 0
+        exited = 0
+        for i in range(lengths[a]):
+            if time_remaining[a, i] <= 0:
+                exiting[a, exited] = visitors[a, i]
+                exited += 1
+            else:
+                visitors[a, kept] = visitors[a, i]
+                time_remaining[a, kept] = time_remaining[a, i] - 1
+                kept += 1
+        lengths[a] = kept
+        exiting_lengths[a] = exited
+
+
+def source_digest():
+    """ 
+    Returns a digest of this file's source, recorded in the ahead-of-time build so stale builds can be detected.
+    """
+
+    with open(__file__, "rb") as source:
+        return int.from_bytes(hashlib.sha256(source.read()).digest()[:7], "little")
+
+
+# The ahead-of-time build produced by compile_kernels.py needs no compilation on first use, but its
+# tick_activities runs serially. It is only used when opted into with PARK_KERNELS_AOT=1, and only
+# if it was built from this exact source.
+park_kernels = None
+if os.environ.get("PARK_KERNELS_AOT") == "1":
+    try:
+        import park_kernels
+    except ImportError:
+        park_kernels = None
+
+if park_kernels is not None and park_kernels.source_digest() != source_digest():
+    warnings.warn("park_kernels was built from a different kernels.py and is ignored, rerun compile_kernels.py")
+    park_kernels = None
+
+if park_kernels is not None:
+    wait_runs = park_kernels.wait_runs
+    tick_activities = park_kernels.tick_activities
@@ -10,7 +10,8 @@ from tabulate import tabulate
 
 from agent import Agent
 from attraction import Attraction
-from activity import Activity
+from activity import Activity, NO_EXPEDITED_RETURN
+from kernels import tick_activities
 
 class Park:
     """ Park simulation class """
@@ -37,6 +38,8 @@ class Park:
         # dynamic
         self.schedule = {}
         self.agents = {}
+        self.attraction_ids = {}
+        self.activity_ids = {}
         self.attractions = {}
         self.activities = {}
         self.history = {"total_active_agents": {}, "distributed_passes": 0, "redeemed_passes": 0}
@@ -111,27 +114,37 @@ class Park:
                 "The percent of behavior archetypes does not add up to 100%"
             )
 
+        self.attraction_ids = {attraction["name"]: index for index, attraction in enumerate(self.attraction_list)}
+        self.activity_ids = {activity["name"]: index for index, activity in enumerate(self.activity_list)}
         total_agents = sum(self.schedule.values())
-        for agent_id in range(total_agents):
-            random.seed(self.random_seed + agent_id)
-            exp_ability = random.uniform(0,1) < exp_ability_pct
-
-            agent = Agent(random_seed=self.random_seed)
-            agent.initialize_agent(
-                agent_id=agent_id,
-                behavior_archetype_distribution=behavior_archetype_distribution,
-                exp_ability=exp_ability,
-                exp_wait_threshold=exp_wait_threshold,
-                exp_limit=exp_limit,
-                attraction_names=[attraction["name"] for attraction in self.attraction_list], 
-                activity_names=[activity["name"] for activity in self.activity_list], 
-            ) 
-            self.agents.update({agent_id: agent})
+        agents = Agent.create_population(
+            n=total_agents,
+            behavior_archetype_distribution=behavior_archetype_distribution,
+            exp_ability_pct=exp_ability_pct,
+            exp_wait_threshold=exp_wait_threshold,
+            exp_limit=exp_limit,
+            attraction_ids=self.attraction_ids,
+            activity_ids=self.activity_ids,
+            master_seed=self.random_seed,
+        )
+        self.agents.update({agent.agent_id: agent for agent in agents})
 
     def generate_attractions(self):
         """ Initializes attractions """
 
+        if not self.schedule:
+            raise AssertionError("The arrival schedule must be generated before the attractions")
+
         self.attraction_list = sorted(self.attraction_list, key=lambda k: k['popularity']) 
+
+        # History of every attraction lives in (time, attraction) tables, one column per attraction
+        # in the order of `self.attractions`, filled in place each minute of the day
+        history_shape = (len(self.schedule), len(self.attraction_list))
+        self.attraction_queue_length_history = np.zeros(history_shape, dtype=np.int32)
+        self.attraction_queue_wait_time_history = np.zeros(history_shape, dtype=np.int32)
+        self.attraction_exp_queue_length_history = np.zeros(history_shape, dtype=np.int32)
+        self.attraction_exp_queue_wait_time_history = np.zeros(history_shape, dtype=np.int32)
+
         for attraction in self.attraction_list:
             self.attractions.update(
                 {
@@ -142,13 +155,38 @@ class Park:
     def generate_activities(self):
         """ Initializes activities """
 
+        if not self.schedule:
+            raise AssertionError("The arrival schedule must be generated before the activities")
+
         self.activity_list = sorted(self.activity_list, key=lambda k: k['popularity']) 
-        for activity in self.activity_list:
+
+        # Visitors of all activities live in shared 2D arrays, one row per activity, so they can be 
+        # advanced by a single kernel. An agent is in at most one activity, so a row holds every agent.
+        total_activities = len(self.activity_list)
+        row_capacity = max(sum(self.schedule.values()), 1)
+        self.activity_visitors = np.zeros((total_activities, row_capacity), dtype=np.int32)
+        self.activity_time_remaining = np.zeros((total_activities, row_capacity), dtype=np.int32)
+        self.activity_lengths = np.zeros(total_activities, dtype=np.int32)
+        self.activity_exiting = np.zeros((total_activities, row_capacity), dtype=np.int32)
+        self.activity_exiting_lengths = np.zeros(total_activities, dtype=np.int32)
+        # Visitor counts of every activity per minute of the day, one column per activity
+        self.activity_visitor_history = np.zeros((len(self.schedule), total_activities), dtype=np.int32)
+
+        # Each activity draws stay times from its own independent stream of the park seed
+        activity_seeds = np.random.SeedSequence(self.random_seed).spawn(total_activities)
+
+        for index, activity in enumerate(self.activity_list):
             self.activities.update(
                 {
-                    activity["name"]: Activity(activity_characteristics=activity, random_seed=self.random_seed)
+                    activity["name"]: Activity(activity_characteristics=activity, random_seed=activity_seeds[index])
                 }
             )
+            self.activities[activity["name"]].bind_storage(
+                index=index,
+                visitors=self.activity_visitors[index],
+                time_remaining=self.activity_time_remaining[index],
+                lengths=self.activity_lengths,
+            )
 
     def step(self):
         """ A minute of time passes, update all agents and attractions. """
@@ -164,7 +202,8 @@ class Park:
         # get idle agents
         idle_agent_ids = self.get_idle_agent_ids()
 
-        # get idle activity action
+        # get idle activity action, arrivals at each activity are gathered and added in one batch
+        activity_arrivals = {activity_name: ([], []) for activity_name in self.activities}
         for agent_id in idle_agent_ids:
             action, location = self.agents[agent_id].make_state_change_decision(
                 attractions_dict=self.attractions, 
@@ -179,41 +218,42 @@ class Park:
                 action=action, 
                 location=location, 
                 time=self.time,
-                attractions=self.attractions
+                attractions=self.attractions,
+                activity_arrivals=activity_arrivals,
             )
+        for activity_name, (agent_ids, expedited_return_times) in activity_arrivals.items():
+            if agent_ids:
+                self.activities[activity_name].add_many(
+                    agent_ids=np.array(agent_ids, dtype=np.int32),
+                    expedited_return_times=np.array(expedited_return_times, dtype=np.int32),
+                )
             
         # process attractions
-        for attraction_name, attraction in self.attractions.items():
-            exiting_agents, loaded_agents = attraction.step(time=self.time, park_close=self.park_close)
-            for agent_id in exiting_agents:
-                self.agents[agent_id].agent_exited_attraction(name=attraction_name, time=self.time)
-            for agent_id in loaded_agents:
-                if self.agents[agent_id].state["current_action"] == "browsing":
-                    # force exit if expedited queue estimate was too high
-                    self.activities[self.agents[agent_id].state["current_location"]].force_exit(agent_id=agent_id)
-                    self.agents[agent_id].agent_exited_activity(
-                        name=self.agents[agent_id].state["current_location"],
-                        time=self.time
-                    )
-                redeem = self.agents[agent_id].agent_boarded_attraction(name=attraction_name, time=self.time)
-                if redeem:
-                    self.history["redeemed_passes"] += 1
-
-        # process activities
-        for activity_name, activity in self.activities.items():
-            exiting_agents = activity.step(time=self.time)
+        self._step_attractions(time=self.time, park_close=self.park_close)
+
+        # process activities, removing finished visitors and counting down the rest in one kernel call
+        tick_activities(
+            self.activity_time_remaining, 
+            self.activity_visitors, 
+            self.activity_lengths, 
+            self.activity_exiting, 
+            self.activity_exiting_lengths,
+        )
+        for index, activity_name in enumerate(self.activities):
+            exiting_agents = self.activity_exiting[index, :self.activity_exiting_lengths[index]]
             for agent_id in exiting_agents:
                 self.agents[agent_id].agent_exited_activity(name=activity_name, time=self.time)
 
         # update time counters and history
         for agent in self.agents.values():
             agent.pass_time()
-        for attraction in self.attractions.values():
+        for index, attraction in enumerate(self.attractions.values()):
             attraction.pass_time()
-            attraction.store_history(time=self.time)
-        for activity in self.activities.values():
-            activity.pass_time()
-            activity.store_history(time=self.time)
+            self.attraction_queue_length_history[self.time, index] = attraction.queue_length
+            self.attraction_queue_wait_time_history[self.time, index] = attraction.get_wait_time()
+            self.attraction_exp_queue_length_history[self.time, index] = attraction.exp_queue_length
+            self.attraction_exp_queue_wait_time_history[self.time, index] = attraction.get_exp_wait_time()
+        self.activity_visitor_history[self.time] = self.activity_lengths
 
         self.calculate_total_active_agents()
 
@@ -224,23 +264,54 @@ class Park:
 
         self.time += 1
 
+    def _step_attractions(self, time, park_close):
+        """ 
+        Runs every attraction's ride cycle, then updates the agents that exited or boarded. 
+        Attractions only touch their own queues while stepping, so all cycles are computed 
+        before any agent is updated.
+        """
+
+        results = [attraction.step(time=time, park_close=park_close) for attraction in self.attractions.values()]
+
+        for attraction_name, (exiting_agents, loaded_agents) in zip(self.attractions, results):
+            for agent_id in exiting_agents:
+                self.agents[agent_id].agent_exited_attraction(name=attraction_name, time=time)
+            for agent_id in loaded_agents:
+                if self.agents[agent_id].current_action == "browsing":
+                    # force exit if expedited queue estimate was too high
+                    self.activities[self.agents[agent_id].current_location].force_exit(agent_id=agent_id)
+                    self.agents[agent_id].agent_exited_activity(
+                        name=self.agents[agent_id].current_location,
+                        time=time
+                    )
+                if attraction_name in self.agents[agent_id].expedited_pass:
+                    self.agents[agent_id].remove_expedited_return_time(attraction=attraction_name)
+                redeem = self.agents[agent_id].agent_boarded_attraction(name=attraction_name, time=time)
+                if redeem:
+                    self.history["redeemed_passes"] += 1
+
     def get_idle_agent_ids(self):
         """ Identifies agents within park who have just arrived, who have exited a ride or who have left an activity """
 
         idle_agent_ids = [
             agent_id for agent_id, agent_dict in self.agents.items()
-            if agent_dict.state["within_park"] and agent_dict.state["current_action"] == "idling"
+            if agent_dict.within_park and agent_dict.current_action == "idling"
         ]
 
         return idle_agent_ids
     
-    def update_park_state(self, agent, action, location, time, attractions):
-        """ Updates the agent state, attraction state and activity state based on the action """
+    def update_park_state(self, agent, action, location, time, attractions, activity_arrivals=None):
+        """ 
+        Updates the agent state, attraction state and activity state based on the action. 
+        When activity_arrivals is given, agents entering an activity are collected there 
+        instead of being added to the activity immediately.
+        """
 
         if action == "leaving":
-            if agent.state["expedited_pass"]:
-                for attraction in agent.state["expedited_pass"]:
+            if agent.expedited_pass:
+                for attraction in agent.expedited_pass:
                     self.attractions[attraction].return_pass(agent.agent_id)
+                    agent.remove_expedited_return_time(attraction=attraction)
                     agent.return_exp_pass(attraction=attraction)
             agent.leave_park(time=time)
             
@@ -251,21 +322,30 @@ class Park:
 
             if location in self.activities:
                 agent.begin_activity(activity=location, time=time)
-                self.activities[location].add_to_activity(
-                    agent_id=agent.agent_id, 
-                    expedited_return_time=agent.state["expedited_return_time"]
-                )
+                expedited_return_expiry = agent.expedited_return_expiry
+                if expedited_return_expiry.size:
+                    expedited_return_time = int(expedited_return_expiry.min()) - time
+                else:
+                    expedited_return_time = NO_EXPEDITED_RETURN
+                if activity_arrivals is not None:
+                    activity_arrivals[location][0].append(agent.agent_id)
+                    activity_arrivals[location][1].append(expedited_return_time)
+                else:
+                    self.activities[location].add_to_activity(
+                        agent_id=agent.agent_id, 
+                        expedited_return_time=expedited_return_time
+                    )
 
         if action == "get pass":
             agent.get_pass(attraction=location, time=time)
             self.attractions[location].remove_pass()
             expedited_wait_time = self.attractions[location].add_to_exp_queue(agent_id=agent.agent_id)
-            agent.assign_expedited_return_time(expedited_wait_time=expedited_wait_time)
+            agent.assign_expedited_return_time(expedited_wait_time=expedited_wait_time, time=time)
 
     def calculate_total_active_agents(self):
         """ Counts how many agents are currently active within the park """
 
-        active_agents = len([agent_id for agent_id, agent in self.agents.items() if agent.state["within_park"]])
+        active_agents = len([agent_id for agent_id, agent in self.agents.items() if agent.within_park])
         self.history["total_active_agents"].update({self.time: active_agents})
 
     def print_metrics(self):
@@ -274,11 +354,11 @@ class Park:
         print(f"Time: {self.time}")
         print(f"Total Agents in Park: {self.history['total_active_agents'][self.time]}")
         print(f"Attraction Wait Times (Minutes):")
-        for attraction_name, attraction in self.attractions.items():
-            print(f"     {attraction_name}: {attraction.history['queue_wait_time'][self.time]}")
+        for index, attraction_name in enumerate(self.attractions):
+            print(f"     {attraction_name}: {self.attraction_queue_wait_time_history[self.time, index]}")
         print(f"Activity Visitor (Agents):")
-        for activity_name, activity in self.activities.items():
-            print(f"     {activity_name}: {activity.history['total_vistors'][self.time]}")
+        for index, activity_name in enumerate(self.activities):
+            print(f"     {activity_name}: {self.activity_visitor_history[self.time, index]}")
         print(f"{'-'*50}\n")
 
     @staticmethod
@@ -377,46 +457,49 @@ class Park:
         queue_wait_time = []
         exp_queue_length = []
         exp_queue_wait_time = []
-        for attraction_name, attraction in self.attractions.items():
-            for time, val in attraction.history["queue_length"].items():
-                queue_length.append({"Time": time, "Agents": val, "Attraction": attraction_name})
-            for time, val in attraction.history["queue_wait_time"].items():
-                queue_wait_time.append({"Time": time, "Minutes": val, "Attraction": attraction_name})
-            for time, val in attraction.history["exp_queue_length"].items():
-                exp_queue_length.append({"Time": time, "Agents": val, "Attraction": attraction_name})
-            for time, val in attraction.history["exp_queue_wait_time"].items():
-                exp_queue_wait_time.append({"Time": time, "Minutes": val, "Attraction": attraction_name})
+        for index, attraction_name in enumerate(self.attractions):
+            for time in range(self.time):
+                queue_length.append(
+                    {"Time": time, "Agents": self.attraction_queue_length_history[time, index], "Attraction": attraction_name}
+                )
+                queue_wait_time.append(
+                    {"Time": time, "Minutes": self.attraction_queue_wait_time_history[time, index], "Attraction": attraction_name}
+                )
+                exp_queue_length.append(
+                    {"Time": time, "Agents": self.attraction_exp_queue_length_history[time, index], "Attraction": attraction_name}
+                )
+                exp_queue_wait_time.append(
+                    {"Time": time, "Minutes": self.attraction_exp_queue_wait_time_history[time, index], "Attraction": attraction_name}
+                )
         
+        # only the minutes up to and including park close count towards the average
+        open_minutes = min(self.time, self.park_close + 1)
+        avg_queue_wait_times = self.attraction_queue_wait_time_history[:open_minutes].mean(axis=0)
+        avg_exp_queue_wait_times = self.attraction_exp_queue_wait_time_history[:open_minutes].mean(axis=0)
         avg_queue_wait_time = []
-        for attraction_name, attraction in self.attractions.items():
-            queue_wait_list = [
-                val for time, val in attraction.history["queue_wait_time"].items()
-                if time <= self.park_close
-            ]
-            exp_queue_wait_list = [
-                val for time, val in attraction.history["exp_queue_wait_time"].items()
-                if time <= self.park_close
-            ]
+        for index, attraction_name in enumerate(self.attractions):
             avg_queue_wait_time.append(
                 {
                     "Attraction": attraction_name,
-                    "Average Wait Time": sum(queue_wait_list)/len(queue_wait_list),
+                    "Average Wait Time": avg_queue_wait_times[index],
                     "Queue Type": "Standby"
                 }
             )
             avg_queue_wait_time.append(
                 {
                     "Attraction": attraction_name,
-                    "Average Wait Time": sum(exp_queue_wait_list)/len(exp_queue_wait_list),
+                    "Average Wait Time": avg_exp_queue_wait_times[index],
                     "Queue Type": "Expedited"
                 }
             )
 
         # Activities
         total_vistors = []
-        for activity_name, activity in self.activities.items():
-            for time, val in activity.history["total_vistors"].items():
-                total_vistors.append({"Time": time, "Agents": val, "Activity": activity_name})
+        for index, activity_name in enumerate(self.activities):
+            for time in range(self.time):
+                total_vistors.append(
+                    {"Time": time, "Agents": self.activity_visitor_history[time, index], "Activity": activity_name}
+                )
 
         # Agent Distribution
         broad_agent_distribution = []
@@ -424,8 +507,8 @@ class Park:
             broad_agent_distribution.append(
                 {
                     "Time": time,
-                    "Approximate Percent": sum(
-                        [attraction.history["queue_length"][time] for attraction in self.attractions.values()]
+                    "Approximate Percent": (
+                        self.attraction_queue_length_history[time].sum()
                     )/total_agents if total_agents > 0 else 0,
                     "Type": "Attractions"
                 }
@@ -433,8 +516,8 @@ class Park:
             broad_agent_distribution.append(
                 {
                     "Time": time,
-                    "Approximate Percent": sum(
-                        [activity.history["total_vistors"][time] for activity in self.activities.values()]
+                    "Approximate Percent": (
+                        self.activity_visitor_history[time].sum()
                     )/total_agents if total_agents > 0 else 0,
                     "Type": "Activities"
                 }
@@ -442,19 +525,19 @@ class Park:
             
         specific_agent_distribution = []
         for time, total_agents in self.history["total_active_agents"].items():
-            for attraction_name, attraction in self.attractions.items():
+            for index, attraction_name in enumerate(self.attractions):
                 specific_agent_distribution.append(
                     {
                         "Time": time,
-                        "Approximate Percent": attraction.history["queue_length"][time]/total_agents if total_agents > 0 else 0,
+                        "Approximate Percent": self.attraction_queue_length_history[time, index]/total_agents if total_agents > 0 else 0,
                         "Type": attraction_name
                     }
             )
-            for activity_name, activity in self.activities.items():
+            for index, activity_name in enumerate(self.activities):
                 specific_agent_distribution.append(
                     {
                         "Time": time,
-                        "Approximate Percent": activity.history["total_vistors"][time]/total_agents if total_agents > 0 else 0,
+                        "Approximate Percent": self.activity_visitor_history[time, index]/total_agents if total_agents > 0 else 0,
                         "Type": activity_name
                     }
             )
@@ -467,16 +550,14 @@ class Park:
                 {
                     "Agent": agent_id,
                     "Behavior": agent.behavior["archetype"],
-                    "Total Attractions Visited": sum(
-                        attraction['times_completed'] for attraction in agent.state["attractions"].values()
-                    )
+                    "Total Attractions Visited": int(agent.attr_visits.sum())
                 }
             )
-            for attraction, attraction_dict in agent.state["attractions"].items():
+            for attraction, attraction_id in self.attraction_ids.items():
                 attraction_density.append(
                     {
                         "Attraction": attraction,
-                        "Visits": attraction_dict["times_completed"]
+                        "Visits": int(agent.attr_visits[attraction_id])
                     }
                 )
 
@@ -613,17 +694,17 @@ class Park:
             dict_list= [
                 {   
                     "Age Class": " ",
-                    "Agents": len([agent_id for agent_id, agent in self.agents.items() if agent.state["age_class"] == "no_child_rides"]),
+                    "Agents": len([agent_id for agent_id, agent in self.agents.items() if agent.age_class == "no_child_rides"]),
                     "Type": "No Child Rides"
                 },
                 {
                     "Age Class": " ",
-                    "Agents": len([agent_id for agent_id, agent in self.agents.items() if agent.state["age_class"] == "no_adult_rides"]),
+                    "Agents": len([agent_id for agent_id, agent in self.agents.items() if agent.age_class == "no_adult_rides"]),
                     "Type": "No Adult Rides"
                 },
                 {
                     "Age Class": " ",
-                    "Agents": len([agent_id for agent_id, agent in self.agents.items() if agent.state["age_class"] == "no_preference"]),
+                    "Agents": len([agent_id for agent_id, agent in self.agents.items() if agent.age_class == "no_preference"]),
                     "Type": "No Preference"
                 },
             ], 
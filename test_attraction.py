@@ -0,0 +1,79 @@
+import unittest
+
+import numpy as np
+
+from attraction import Attraction
+
+
+class AttractionQueueTest(unittest.TestCase):
+    """
+    Drives an attraction with random queue operations and checks its head-indexed queues against
+    plain lists updated the way the original list-based attraction did.
+    """
+
+    def test_matches_list_queues(self):
+        rng = np.random.default_rng(0)
+        attraction = Attraction(
+            {
+                "name": "Ride",
+                "run_time": 5,
+                "hourly_throughput": 60,
+                "popularity": 5,
+                "child_eligible": True,
+                "adult_eligible": True,
+                "expedited_queue": True,
+                "expedited_queue_ratio": 0.4,
+            }
+        )
+        capacity, exp_seats = attraction._capacity, attraction._exp_seats
+
+        queue, exp_queue, riders = [], [], []
+        compacted = grew = False
+        next_agent_id = 0
+        for time in range(3000):
+            # Alternate busy and quiet hours so the queues both build up and drain
+            busy = (time // 60) % 2 == 0
+            for _ in range(int(rng.poisson(2.0 if busy else 0.5))):
+                head, size = attraction._queue_head, len(attraction.queue)
+                attraction.add_to_queue(next_agent_id)
+                compacted |= head > 0 and attraction._queue_head == 0
+                grew |= len(attraction.queue) > size
+                queue.append(next_agent_id)
+                next_agent_id += 1
+            if rng.random() < (0.8 if busy else 0.2):
+                head, size = attraction._exp_queue_head, len(attraction.exp_queue)
+                attraction.add_to_exp_queue(next_agent_id)
+                compacted |= head > 0 and attraction._exp_queue_head == 0
+                grew |= len(attraction.exp_queue) > size
+                exp_queue.append(next_agent_id)
+                next_agent_id += 1
+            if exp_queue and rng.random() < 0.1:
+                agent_id = exp_queue[int(rng.integers(len(exp_queue)))]
+                attraction.return_pass(agent_id)
+                exp_queue.remove(agent_id)
+
+            exiting_agents, loaded_agents = attraction.step(time=time, park_close=1440)
+            if time % attraction.run_time == 0:
+                # Expedited riders board first, the regular queue fills the seats the expedited queue leaves
+                max_queue_agents = max(capacity - len(exp_queue), 0)
+                self.assertEqual(list(exiting_agents), riders)
+                riders = exp_queue[:exp_seats] + queue[:max_queue_agents]
+                exp_queue, queue = exp_queue[exp_seats:], queue[max_queue_agents:]
+                self.assertEqual(list(loaded_agents), riders)
+            else:
+                self.assertEqual(list(exiting_agents), [])
+                self.assertEqual(list(loaded_agents), [])
+            attraction.pass_time()
+
+            self.assertEqual(attraction.state["queue"].tolist(), queue)
+            self.assertEqual(attraction.state["exp_queue"].tolist(), exp_queue)
+            self.assertEqual(attraction.queue_length, len(queue))
+            self.assertEqual(attraction.exp_queue_length, len(exp_queue))
+
+        # Both ways of making room were exercised
+        self.assertTrue(compacted)
+        self.assertTrue(grew)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+
+import numpy as np
+
+from activity import Activity, NO_EXPEDITED_RETURN
+from kernels import tick_activities, wait_runs
+
+
+def reference_wait_runs(queue_len, exp_queue_len, capacity, exp_seats, standby_seats, target_exp):
+    """
+    Counts ride runs with the original one-run-at-a-time loop that `wait_runs` replaces.
+
+    Parameters:
+    - queue_len (int): Number of visitors in the regular queue
+    - exp_queue_len (int): Number of visitors in the expedited queue
+    - capacity (int): Maximum visitors per ride run
+    - exp_seats (int): Seats per run reserved for the expedited queue
+    - standby_seats (int): Seats per run left for the regular queue
+    - target_exp (bool): Count runs for the expedited queue instead of the regular queue
+    """
+
+    runs = 0
+    while (exp_queue_len if target_exp else queue_len) >= capacity:
+        if exp_queue_len > exp_seats:
+            exp_queue_len -= exp_seats
+            if queue_len > standby_seats:
+                queue_len -= standby_seats
+            else:
+                queue_len = 0
+        else:
+            queue_len -= capacity - exp_queue_len
+            exp_queue_len = 0
+
+        runs += 1
+
+    return runs
+
+
+class WaitRunsTest(unittest.TestCase):
+    """
+    Checks the closed-form run count against the original loop over a grid of queue states.
+    """
+
+    def test_matches_reference_loop(self):
+        for capacity in range(1, 13):
+            for exp_seats in range(0, capacity + 1):
+                standby_seats = capacity - exp_seats
+                for queue_len in range(0, 41):
+                    for exp_queue_len in range(0, 41):
+                        args = (queue_len, exp_queue_len, capacity, exp_seats, standby_seats)
+                        self.assertEqual(
+                            wait_runs(*args, False), reference_wait_runs(*args, False), args
+                        )
+                        # Without reserved seats the original expedited loop never terminates
+                        if exp_seats > 0:
+                            self.assertEqual(
+                                wait_runs(*args, True), reference_wait_runs(*args, True), args
+                            )
+
+    def test_expedited_queue_without_seats(self):
+        self.assertEqual(wait_runs(5, 20, 4, 0, 4, True), 0)
+
+
+class TickActivitiesTest(unittest.TestCase):
+    """
+    Advances activities bound to shared storage with the kernel and checks them against the original 
+    list semantics: visitors whose remaining time reached 0 leave, then everyone else counts down.
+    """
+
+    def test_matches_list_semantics(self):
+        rng = np.random.default_rng(0)
+        total_activities, row_capacity = 3, 400
+
+        visitors = np.zeros((total_activities, row_capacity), dtype=np.int32)
+        time_remaining = np.zeros((total_activities, row_capacity), dtype=np.int32)
+        lengths = np.zeros(total_activities, dtype=np.int32)
+        exiting = np.zeros((total_activities, row_capacity), dtype=np.int32)
+        exiting_lengths = np.zeros(total_activities, dtype=np.int32)
+
+        activities = []
+        for index in range(total_activities):
+            activity = Activity(
+                {"name": f"activity {index}", "popularity": 5, "mean_time": 4 + 3 * index}, random_seed=index
+            )
+            activity.bind_storage(index, visitors[index], time_remaining[index], lengths)
+            activities.append(activity)
+        # (visitor IDs, remaining times) of each activity as plain lists
+        models = [([], []) for _ in activities]
+
+        next_agent_id = 0
+        for _ in range(200):
+            for activity, (model_visitors, model_times) in zip(activities, models):
+                # Admit a few visitors, some with a reservation that is due soon
+                arrivals = int(rng.integers(0, 4))
+                agent_ids = np.arange(next_agent_id, next_agent_id + arrivals, dtype=np.int32)
+                next_agent_id += arrivals
+                return_times = np.where(
+                    rng.random(arrivals) < 0.3, rng.integers(0, 3, arrivals), NO_EXPEDITED_RETURN
+                ).astype(np.int32)
+                activity.add_many(agent_ids, return_times)
+                model_visitors.extend(agent_ids.tolist())
+                model_times.extend(activity.state["visitor_time_remaining"][len(model_times):].tolist())
+
+            tick_activities(time_remaining, visitors, lengths, exiting, exiting_lengths)
+
+            for index, (activity, (model_visitors, model_times)) in enumerate(zip(activities, models)):
+                model_exits = [agent_id for agent_id, time in zip(model_visitors, model_times) if time == 0]
+                kept = [(agent_id, time - 1) for agent_id, time in zip(model_visitors, model_times) if time != 0]
+                model_visitors[:] = [agent_id for agent_id, _ in kept]
+                model_times[:] = [time for _, time in kept]
+
+                self.assertEqual(exiting[index, :exiting_lengths[index]].tolist(), model_exits)
+                self.assertEqual(activity.state["visitors"].tolist(), model_visitors)
+                self.assertEqual(activity.state["visitor_time_remaining"].tolist(), model_times)
+
+
+if __name__ == "__main__":
+    unittest.main()
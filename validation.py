@@ -0,0 +1,23 @@
+import numpy as np
+
+def validate_popularity(kind, name, popularity, low, high):
+    """ 
+    Ensures a popularity value is an integer between `low` and `high`.
+
+    Parameters:
+    - kind (str): Type of park feature being validated, used in the error message (e.g., "Activity")
+    - name (str): Name of the park feature
+    - popularity: The popularity value to check
+    - low (int): Smallest allowed popularity
+    - high (int): Largest allowed popularity
+    """
+
+    # NumPy integers are accepted, booleans are not even though they subclass int
+    if (
+        isinstance(popularity, bool)
+        or not isinstance(popularity, (int, np.integer))
+        or not low <= popularity <= high
+    ):
+        raise AssertionError(
+            f"{kind} {name} 'popularity' value must be an integer between {low} and {high}"
+        )